@@ -11,24 +11,157 @@ import matplotlib.pyplot as plt
 from matplotlib.colors import colorConverter
 import plotly.graph_objects as go
 import plotly.express as px
+import scipy.sparse as sp
+from numba import njit, prange
 
 from turtle import bgcolor
+import hashlib
+import io
+import pickle
 import re
 from pathlib import Path
 
+# message type codes for the jitted roll builder
+NOTE_ON = 0
+NOTE_OFF = 1
+
+# text-like meta messages nothing downstream consumes
+SKIP_META_TYPES = ("lyrics", "text", "marker", "cue_marker", "copyright")
+
+# bump whenever the pickled layout of the parse cache changes
+# (roll/events representation, derived attributes, ...) so stale cache
+# files from older code are ignored instead of loaded
+PARSE_CACHE_VERSION = 2
+
+
+def _volume_at_notes(cc_pos, is_cc7, cc_vals, on_pos):
+    """
+    Volume in effect at each note_on position, computed from cc7 (Main
+    Volume) and cc11 (Expression Controller) events in one pass.
+
+    cc7 sets volume to 100*value//127; cc11 scales it by value//127,
+    i.e. zeroes it unless value == 127 (same as the scalar update).
+    Vectorized: the base volume comes from the most recent cc7, zeroed
+    if any volume-zeroing cc11 occurred since then.
+    """
+    if cc_pos.size == 0:
+        return np.full(on_pos.size, 100, dtype=np.int64)
+
+    base = np.concatenate(([100], 100*cc_vals[is_cc7] // 127))
+    group = np.cumsum(is_cc7)  # which cc7 governs each cc event
+    zeroing = np.cumsum(~is_cc7 & (cc_vals != 127))
+    last_cc7 = np.maximum.accumulate(
+        np.where(is_cc7, np.arange(cc_pos.size), -1))
+    zeroing_at_cc7 = np.where(
+        last_cc7 >= 0, zeroing[np.maximum(last_cc7, 0)], 0)
+    after_cc = np.where(zeroing == zeroing_at_cc7, base[group], 0)
+
+    volumes = np.concatenate(([100], after_cc))
+    return volumes[np.searchsorted(cc_pos, on_pos)]
+
+
+@njit(parallel=True, cache=True)
+def _roll_segments(ch_offsets, times, type_codes, notes, intensities, sr):
+    """
+    Run the note state machine over the flat event arrays of all
+    channels (channel ch owns [ch_offsets[ch], ch_offsets[ch+1])) and
+    return note segments as (starts, ends, notes, intensities, counts).
+    An end of -1 marks a note still open at the end of its channel.
+
+    Channels are independent, so the outer loop runs in prange; each
+    channel writes only its own disjoint slice of the output arrays
+    (its event span plus 128 slots for open notes), with counts[ch]
+    giving the number of valid entries.
+    """
+    nch = ch_offsets.size - 1
+    starts = np.empty(times.size + 128*nch, dtype=np.int64)
+    ends = np.empty(times.size + 128*nch, dtype=np.int64)
+    seg_notes = np.empty(times.size + 128*nch, dtype=np.int64)
+    seg_vals = np.empty(times.size + 128*nch, dtype=np.int64)
+    counts = np.zeros(nch, dtype=np.int64)
+
+    for ch in prange(nch):
+        lo = ch_offsets[ch]
+        hi = ch_offsets[ch + 1]
+        k = lo + 128*ch  # start of this channel's output region
+
+        # register the state (on/off) of each key
+        reg_end = np.full(128, -1, dtype=np.int64)
+        reg_intensity = np.zeros(128, dtype=np.int64)
+
+        for i in range(lo, hi):
+            code = type_codes[i]
+            if code == NOTE_ON:
+                end_time = times[i] // sr
+                intensity = intensities[i]
+                key = notes[i]
+                if reg_end[key] != -1:  # not after note_off
+                    starts[k] = reg_end[key]
+                    ends[k] = end_time
+                    seg_notes[k] = key
+                    seg_vals[k] = reg_intensity[key]
+                    k += 1
+                reg_end[key] = end_time
+                reg_intensity[key] = intensity
+            elif code == NOTE_OFF:
+                key = notes[i]
+                if reg_end[key] != -1:
+                    starts[k] = reg_end[key]
+                    ends[k] = times[i] // sr
+                    seg_notes[k] = key
+                    seg_vals[k] = reg_intensity[key]
+                    k += 1
+                    reg_end[key] = -1  # reinitialize register
+
+        # if there is a note not closed at the end of a channel, close it
+        for key in range(128):
+            if reg_end[key] != -1:
+                starts[k] = reg_end[key]
+                ends[k] = -1
+                seg_notes[k] = key
+                seg_vals[k] = reg_intensity[key]
+                k += 1
+
+        counts[ch] = k - (lo + 128*ch)
+
+    return starts, ends, seg_notes, seg_vals, counts
+
+
 class MidiFile(mido.MidiFile):
     def __init__(self, path, fname, verbose=False):
         self.sr = 10   # down sampling rate from MIDI to time axis
         self.meta = {}
         self.max_nch = 16
+        self.length_ticks = None  # filled by get_total_ticks()
 
         self.path = path
         self.fname = fname
         midifile = "{0}/{1}/{1}.mid".format(path, fname)
-
-        mido.MidiFile.__init__(self, midifile)
         self.fpath = Path(midifile)
 
+        # read the file once; the same bytes feed the cache key and the parser
+        data = self.fpath.read_bytes()
+
+        # parse results are memoized on disk, keyed on the file contents,
+        # so restarting the server does not redo parsing and roll building
+        self._md5 = hashlib.md5(data).hexdigest()
+        fcache = Path("outputs/.cache/{}-v{}.pkl".format(
+            self._md5, PARSE_CACHE_VERSION))
+        if fcache.exists():
+            print("loading parse cache: {}".format(fcache))
+            with fcache.open("rb") as f:
+                self.__dict__.update(pickle.load(f))
+            self.path = path
+            self.fname = fname
+            self.fpath = Path(midifile)
+            return
+
+        # clip=True tolerates out-of-range data bytes instead of raising;
+        # latin1 never fails to decode the text metadata we ignore anyway
+        mido.MidiFile.__init__(
+            self, file=io.BytesIO(data), clip=True, charset='latin1')
+        self.filename = midifile
+
         self.events, self.nch = self.get_events(verbose)
         self.roll, self.note_range, self.intensity_range = self.get_roll(
             self.events, verbose)
@@ -38,7 +171,11 @@ class MidiFile(mido.MidiFile):
             self.length_ticks, self.ticks_per_beat, self.get_tempo())
         self.ticks_per_sec = self.length_ticks / self.length_seconds  # miditicks/sec
         self.xticks_per_sec = self.ticks_per_sec / self.sr
-        self.show_basic_info_st()
+
+        fcache.parent.mkdir(parents=True, exist_ok=True)
+        print("exporting parse cache: {}".format(fcache))
+        with fcache.open("wb") as f:
+            pickle.dump(self.__dict__, f)
 
     def show_basic_info_st(self):
         st.sidebar.write('## midi file')
@@ -71,13 +208,16 @@ class MidiFile(mido.MidiFile):
         except:
             return 500000
 
-    #@st.cache_data
     def get_events(self, verbose=False):
         """
         Extract self.max_nch (default: 16) channel data from MIDI and return a list.
-        Lyrics and meta message data used in extra channels are not include in the list.
+        Lyrics and meta message data used in extra channels are not include in the list;
+        meta message data is kept in self.meta.
 
-        Meta message data with time is converted to "continue" message type
+        Tracks are flattened into one time-ordered stream with
+        mido.merge_tracks, so ticks are absolute and global: channels
+        spread over several tracks stay aligned on one timeline. Each
+        channel entry is a list of (absolute_tick, message) pairs.
 
         Returns:
             list : [[ch1],[ch2]....[ch16]] # Note that empty channel is removed!
@@ -90,140 +230,168 @@ class MidiFile(mido.MidiFile):
             f.write(str(x) + "\n")
         f.close()
 
-        mid = self
         events = [[] for i in range(self.max_nch)]
 
-        for ch, track in enumerate(mid.tracks):
-            for msg in track:
-                try:
-                    channel = msg.channel
-                    events[channel].append(msg)
-                except AttributeError:
-                    try:
-                        if type(msg) != type(mido.UnknownMetaMessage):
-                            self.meta[msg.type] = msg.dict()
-                            if msg.time != 0:
-                                # append meta message as "continue" type message
-                                # https://mido.readthedocs.io/en/latest/message_types.html
-                                sysex = mido.Message('continue', time=msg.time)
-                                events[ch].append(sysex)
-                        else:
-                            pass
-                    except:
-                        print("error", type(msg))
+        abs_tick = 0
+        for msg in mido.merge_tracks(self.tracks):
+            abs_tick += msg.time
+            if msg.type in SKIP_META_TYPES:
+                continue
+            try:
+                events[msg.channel].append((abs_tick, msg))
+            except AttributeError:
+                if not isinstance(msg, mido.UnknownMetaMessage):
+                    self.meta[msg.type] = msg.dict()
 
         events = list(filter(None, events))  # remove emtpy channel
         return events, len(events)
 
-    #@st.cache_data
     def get_total_ticks(self):
-        max_ticks = 0
-        for channel in range(self.nch):
-            ticks = sum(msg.time for msg in self.events[channel])
-            if ticks > max_ticks:
-                max_ticks = ticks
-        return max_ticks
-
-    #@st.cache
+        """Total length in ticks; computed once, then cached."""
+        if self.length_ticks is None:
+            max_ticks = 0
+            for channel in self.events:
+                if channel and channel[-1][0] > max_ticks:
+                    max_ticks = channel[-1][0]
+            self.length_ticks = max_ticks
+        return self.length_ticks
+
     def get_roll(self, events, verbose=False):
         """
-        Convert event (channel) data to piano roll data
+        Convert event (channel) data to piano roll data.
+
+        The message walk is vectorized: each channel is turned into flat
+        NumPy arrays (absolute tick, type, note, velocity, ...) in one pass,
+        note on/off events are paired per pitch with a stable sort, and the
+        resulting segments are written into roll with slice fills.
+
+        The roll is mostly zeros, so it is stored as one scipy.sparse CSR
+        matrix (128 x ticks) per channel; dense slices are materialized
+        only when a display window is drawn. Intensities are quantized
+        to 4 bits (intensity >> 3) for storage: the display path only
+        maps them through a colormap, so finer resolution is invisible.
         """
         intensity_range = [100, 0]  # [min, max] adjusted by get_roll()
         note_range = [127, 0]  # [min, max] adjusted by get_roll()
 
         length_ticks = self.get_total_ticks()  # get total length in tick unit
 
-        roll = np.zeros(
-            (self.nch, 128, length_ticks // self.sr), dtype="int8")
-        # register the state (on/off) of each key
-        register_note = [int(-1)]*128
+        roll = []  # one 128 x (length_ticks//sr) CSR matrix per channel
         # register the state (program_change) of each channel
         register_timbre = np.ones(self.nch)
 
-        # cols = ["id", "type", "note", "note_name",
-        #         "time_counter", "time", "velocity"]
         # only using to save midi data (not for processing in this file)
-        df = pd.DataFrame(index=[], columns=[])
+        df_channels = []
 
-        for idx, channel in enumerate(events):
-            time_counter = 0
-            volume = 100
+        all_seg_vals = []
+        all_seg_notes = []
+
+        # prelude: per-channel flat arrays, concatenated for one
+        # parallel jit call over all channels
+        ch_times = []
+        ch_codes = []
+        ch_notes = []
+        ch_intensities = []
 
+        for idx, channel in enumerate(events):
             if verbose:
                 print("[get_roll()]")
                 print("channel", idx, "start")
 
-            for msg in channel:
-                if msg.type == "marker":
-                    print("Found Marker==============")
-                if msg.type == "control_change":
-                    if msg.is_cc(7):  # if msg.control == 7: Main Volume
-                        volume = 100*msg.value // 127  # [0, 100]
-
-                    if msg.is_cc(11):  # if msg.control == 11: Expression Controller
-                        # volume[0,100] x expression[0,127]/127
-                        volume *= msg.value // 127
-
-                if msg.type == "program_change":
-                    register_timbre[idx] = msg.program
-                    if verbose:
-                        print("channel", idx, "pc", msg.program, "time",
-                              time_counter, "duration", msg.time)
-
-                if msg.type == "note_on":
-                    # note_on_start_time = time_counter // self.sr
-                    note_on_end_time = (time_counter + msg.time) // self.sr
-                    intensity = volume * msg.velocity // 127
-
-                    intensity_range[0] = min([intensity_range[0], intensity])
-                    intensity_range[0] = max([intensity_range[1], intensity])
-
-                    if register_note[msg.note] != -1:  # not after note_off
-                        last_end_time, last_intensity = register_note[msg.note]
-                        roll[idx, msg.note,
-                             last_end_time:note_on_end_time] = last_intensity
-
-                    register_note[msg.note] = (note_on_end_time, intensity)
-
-                    note_range[0] = min([note_range[0], msg.note])
-                    note_range[1] = max([note_range[1], msg.note])
-
-                if msg.type == "note_off":
-                    # note_off_start_time = time_counter // self.sr
-                    note_off_end_time = (time_counter + msg.time) // self.sr
-                    last_end_time, last_intensity = register_note[msg.note]
-                    roll[idx, msg.note,
-                         last_end_time:note_off_end_time] = last_intensity
-
-                    register_note[msg.note] = -1  # reinitialize register
-
-                msg_dct = msg.dict()
-                if "time" in msg_dct:
-                    time_counter += msg.time
-
-                    df_new = pd.DataFrame(msg_dct, index=[idx])
-                    df_new["time_counter"] = time_counter
-                    if "note" in msg_dct:
-                        df_new["note_name"] = note.Note(msg.note).nameWithOctave
-
-                    if verbose:
-                        print(df_new)
-
-                    df = pd.concat([df, df_new])
-
-            fcsv = "outputs/{}.csv".format(self.fname)
-            print("exporting csv file: {}".format(fcsv))
-            df.to_csv(fcsv, index=False)
-
-            # if there is a note not closed at the end of a channel, close it
-            for key, data in enumerate(register_note):
-                if data != -1:
-                    note_on_end_time = data[0]
-                    intensity = data[1]
-                    # note_off_start_time = time_counter // self.sr
-                    roll[idx, key, note_on_end_time:] = intensity
-                register_note[idx] = -1
+            # one pass over the messages: flat arrays of per-message fields
+            times = np.array([tick for tick, msg in channel])  # absolute ticks
+            msgs = [msg for tick, msg in channel]
+            types = np.array([msg.type for msg in msgs])
+            notes = np.array([getattr(msg, "note", -1) for msg in msgs])
+            vels = np.array([getattr(msg, "velocity", 0) for msg in msgs])
+
+            if np.any(types == "marker"):
+                print("Found Marker==============")
+
+            pc_idx = np.where(types == "program_change")[0]
+            if pc_idx.size > 0:
+                register_timbre[idx] = msgs[pc_idx[-1]].program
+                if verbose:
+                    for i in pc_idx:
+                        print("channel", idx, "pc", msgs[i].program, "time",
+                              times[i], "duration", msgs[i].time)
+
+            # encode message types as small ints for the jitted state machine
+            ctrls = np.array([getattr(msg, "control", -1) for msg in msgs])
+            vals = np.array([getattr(msg, "value", 0) for msg in msgs])
+            type_codes = np.full(len(channel), -1, dtype=np.int8)
+            type_codes[types == "note_on"] = NOTE_ON
+            type_codes[types == "note_off"] = NOTE_OFF
+
+            # volume curve precomputed over cc7/cc11 events, sampled at
+            # the note_on positions
+            cc_pos = np.where(
+                (types == "control_change") & ((ctrls == 7) | (ctrls == 11)))[0]
+            on_pos = np.where(types == "note_on")[0]
+            vol_at_on = _volume_at_notes(
+                cc_pos, ctrls[cc_pos] == 7, vals[cc_pos], on_pos)
+            intensities = np.zeros(len(channel), dtype=np.int64)
+            intensities[on_pos] = vol_at_on * vels[on_pos] // 127
+
+            ch_times.append(times.astype(np.int64))
+            ch_codes.append(type_codes)
+            ch_notes.append(notes.astype(np.int64))
+            ch_intensities.append(intensities)
+
+            df_ch = pd.DataFrame([msg.dict() for msg in msgs])
+            df_ch["time_counter"] = times
+            if "note" in df_ch.columns:
+                names = {n: note.Note(int(n)).nameWithOctave
+                         for n in np.unique(notes[notes >= 0])}
+                df_ch["note_name"] = df_ch["note"].map(names)
+            if verbose:
+                print(df_ch)
+            df_channels.append(df_ch)
+
+        # one parallel state-machine run over all channels
+        ch_offsets = np.zeros(self.nch + 1, dtype=np.int64)
+        ch_offsets[1:] = np.cumsum([a.size for a in ch_times])
+        starts, ends, seg_notes_all, seg_vals_all, counts = _roll_segments(
+            ch_offsets, np.concatenate(ch_times), np.concatenate(ch_codes),
+            np.concatenate(ch_notes), np.concatenate(ch_intensities), self.sr)
+
+        T = length_ticks // self.sr
+        for idx in range(self.nch):
+            base = ch_offsets[idx] + 128*idx
+            sl = slice(base, base + counts[idx])
+            seg_starts = starts[sl]
+            seg_notes = seg_notes_all[sl]
+            seg_vals = seg_vals_all[sl]
+
+            # every note_on contributes exactly one segment; ranges are
+            # reduced in one shot after the loop
+            all_seg_vals.append(seg_vals)
+            all_seg_notes.append(seg_notes)
+
+            # difference encoding: scatter +v at starts and -v at ends,
+            # then one cumsum per pitch row -- a single linear pass
+            # instead of variable-length segment writes
+            # (4-bit display resolution; ranges above keep full precision)
+            seg_ends = np.where(ends[sl] == -1, T, ends[sl])  # -1: open to the end
+            deltas = np.zeros((128, T + 1), dtype=np.int16)
+            q = (seg_vals >> 3).astype(np.int16)
+            np.add.at(deltas, (seg_notes, seg_starts), q)
+            np.add.at(deltas, (seg_notes, seg_ends), -q)
+            buf = np.cumsum(deltas[:, :T], axis=1).astype("uint8")
+
+            roll.append(sp.csr_matrix(buf))
+
+        # branchless range reduction over all channels at once
+        seg_vals = np.concatenate(all_seg_vals) if all_seg_vals else np.empty(0)
+        seg_notes = np.concatenate(all_seg_notes) if all_seg_notes else np.empty(0)
+        if seg_vals.size > 0:
+            intensity_range = [int(seg_vals.min()), int(seg_vals.max())]
+            note_range = [int(seg_notes.min()), int(seg_notes.max())]
+
+        df = pd.concat(df_channels) if df_channels else pd.DataFrame()
+        fcsv = "outputs/{}.csv".format(self.fname)
+        print("exporting csv file: {}".format(fcsv))
+        df.to_csv(fcsv, index=False)
 
         return roll, note_range, intensity_range
 
@@ -232,15 +400,25 @@ class MidiFile(mido.MidiFile):
         Display basic information and initialize graphics. 
         Called by draw_roll()
         """
-        dsp_len_seconds = xlim[1]-xlim[0]
-
-        # x ticks
-        xticks_interval_sec = dsp_len_seconds // 10 if dsp_len_seconds > 10 else dsp_len_seconds/10
-        xticks_interval = xticks_interval_sec * self.xticks_per_sec
-        #xticks_interval = mido.second2tick(
-        #    xticks_interval_sec, self.ticks_per_beat, self.get_tempo()) / self.sr  # [ticks/interval]
-        #print("xticks_interval_sec: ", xticks_interval_sec)
-        #print("xticks_interval: {} [ticks/label]".format(xticks_interval))
+        # x ticks, memoized per xlim: draw_roll runs on every rerun but
+        # the tick positions only change with the display window
+        if not hasattr(self, "_xticks_cache"):
+            self._xticks_cache = {}
+        key = (xlim[0], xlim[1])
+        if key not in self._xticks_cache:
+            dsp_len_seconds = xlim[1]-xlim[0]
+            xticks_interval_sec = dsp_len_seconds // 10 if dsp_len_seconds > 10 else dsp_len_seconds/10
+            xticks_interval = xticks_interval_sec * self.xticks_per_sec
+            #xticks_interval = mido.second2tick(
+            #    xticks_interval_sec, self.ticks_per_beat, self.get_tempo()) / self.sr  # [ticks/interval]
+            #print("xticks_interval_sec: ", xticks_interval_sec)
+            #print("xticks_interval: {} [ticks/label]".format(xticks_interval))
+            xs = np.arange(int(self.length_ticks//xticks_interval))
+            self._xticks_cache[key] = (
+                (xs * xticks_interval).astype(int),
+                np.round(xs * xticks_interval_sec, 2),
+            )
+        xtick_pos, xtick_labels = self._xticks_cache[key]
 
         # Initialize graphics
         plt.rcParams["font.size"] = 20
@@ -249,11 +427,7 @@ class MidiFile(mido.MidiFile):
         ax.axis("equal")
         ax.set_facecolor(bgcolor)
 
-        nxticks = int(self.length_ticks//xticks_interval)
-        plt.xticks(
-            [int(x * xticks_interval) for x in range(nxticks)],
-            [round(x * xticks_interval_sec, 2) for x in range(nxticks)]
-        )
+        plt.xticks(xtick_pos, xtick_labels)
         plt.yticks([y*12 for y in range(9)], [y*12 for y in range(9)])
 
         ax.set_xlabel("time [s]")
@@ -273,7 +447,7 @@ class MidiFile(mido.MidiFile):
         ax.set_xlabel("time [s]")
         ax.set_ylabel("note")
 
-        return fig, ax, xlim_ticks
+        return fig, ax, xlim_ticks, ylim
 
     def get_colormap_selector(self, cmap_name=None, bgcolor='white'):
         """ Define color map for each channel """
@@ -289,43 +463,7 @@ class MidiFile(mido.MidiFile):
         cmap_name = st.sidebar.selectbox(
             'colormap', cmap_list, index=default_idx)
 
-        if cmap_name == None:
-            transparent = colorConverter.to_rgba(bgcolor)
-            colors = [
-                mpl.colors.to_rgba(mpl.colors.hsv_to_rgb(
-                    (i / self.nch, 1, 1)), alpha=1)
-                for i in range(self.nch)
-            ]
-            cmaps = [
-                mpl.colors.LinearSegmentedColormap.from_list(
-                    'my_cmap', [transparent, colors[i]], 128)
-                for i in range(self.nch)
-            ]
-        else:
-            cmap= mpl.cm.get_cmap(cmap_name)
-            #cmap = mpl.colormaps[cmap_name]
-            print(cmap)
-            cmaps = [cmap for i in range(self.nch)]
-
-        """
-        make look up table (LUT) data, e.g., (K=3)
-            array([[0. , 0. , 0. , 0. ],
-                [0.5, 0. , 0. , 0.2],
-                [1. , 0. , 0. , 0.4],
-                [0. , 0. , 0. , 0.6],
-                [1. , 0. , 0. , 0.8],
-                [0. , 0. , 0. , 1. ]])
-            The first 3 rows are colormap, and the last 3 rows are the colours
-            for data low and high out-of-range values and for masked values.
-            https://stackoverflow.com/questions/18035411/meaning-of-the-colormap-lut-list-in-matplotlib-color
-        """
-        for i in range(self.nch):
-            cmaps[i]._init()
-            # about 3 extra rows, see the example above
-            alphas = np.linspace(0, 1, cmaps[i].N + 3)
-            cmaps[i]._lut[:, -1] = alphas
-
-        return cmaps
+        return _build_cmaps(cmap_name, bgcolor, self.nch)
 
     def get_bgcolor_slider(self, bgcolor='white'):
         bgcolors = ('white', 'black')
@@ -367,20 +505,28 @@ class MidiFile(mido.MidiFile):
         if len(xlim) == 0:
             xlim = [0, int(self.length_seconds)]
 
-        fig, ax1, xlim_ticks = self._grp_init(
+        fig, ax1, xlim_ticks, ylim = self._grp_init(
             figsize=figsize, xlim=xlim, ylim=ylim, bgcolor=bgcolor)
 
         if cmaps == None:
             cmaps=self.get_colormap_selector('Purple')
 
+        # rows outside the displayed note range are never rasterized
+        note_lo = max(int(ylim[0]), 0)
+        note_hi = min(int(ylim[1]), 127)
+
         for i in range(self.nch):
             try:
-                target_roll = self.roll[i, :, :int(xlim_ticks[1])]
-                #target_roll = self.roll[i, :, :]
+                # rasterize only the displayed window, not the full roll
+                target_roll = _dense_window(
+                    self.roll[i], self._md5, i,
+                    note_lo, note_hi, int(xlim_ticks[1]))
 
-                max_intensity = np.max(np.array(target_roll))
+                max_intensity = np.max(target_roll)
                 print("max_intensity:", max_intensity)
-                im = ax1.imshow(self.roll[i], origin="lower",
+                im = ax1.imshow(target_roll, origin="lower",
+                                extent=[0, target_roll.shape[1],
+                                        note_lo, note_hi + 1],
                                 interpolation='nearest', cmap=cmaps[i], aspect='auto', clim=[0, max_intensity])
                 if hlines != False:
                     ax1.hlines([12*(i+1) for i in range(9)], xlim_ticks[0],
@@ -407,12 +553,123 @@ class MidiFile(mido.MidiFile):
         #plt.ion()
         with st.container():
             st.pyplot(fig)
-        fimg = "outputs/{}.png".format(self.fname)
-        print("exporting png file: {}".format(fimg))
-        plt.savefig(fimg, bbox_inches="tight")
+        # PNG encoding takes hundreds of ms, so keep it off the rerun
+        # hot path and export only on demand
+        if st.sidebar.button('Save PNG', key='save_png_{}_{}'.format(self.fname, xlim)):
+            fimg = "outputs/{}.png".format(self.fname)
+            print("exporting png file: {}".format(fimg))
+            fig.savefig(fimg, bbox_inches="tight")
         if plot:
             plt.show(block=True)
 
+    def draw_roll_plotly(self, xlim=None, ylim=[30, 92], bgcolor='white'):
+        """Create the piano roll as an interactive Plotly figure.
+
+        One go.Heatmap trace per channel, coloured by channel hue.
+        Pan/zoom run client-side in the browser, so changing the view
+        does not rerun any Python. The figure is built once per
+        MidiFile and reused across reruns; only the axis ranges and
+        background color are updated.
+
+        Args:
+            xlim: initial time range [s] (None: full range)
+
+            ylim: initial note range (None: full range)
+
+            bgcolor (string): name of background color
+        """
+        if getattr(self, "_plotly_fig", None) is None:
+            fig = go.Figure()
+            xs = np.arange(self.roll[0].shape[1]) / self.xticks_per_sec
+            for i in range(self.nch):
+                dense = self.roll[i].toarray()
+                hue = int(360 * i / self.nch)
+                colorscale = [[0.0, "rgba(0,0,0,0)"],
+                              [1.0, "hsl({},100%,40%)".format(hue)]]
+                fig.add_trace(go.Heatmap(
+                    z=dense, x=xs, colorscale=colorscale,
+                    zmin=0, zmax=max(int(dense.max()), 1),
+                    showscale=False, name="ch{}".format(i)))
+            fig.update_xaxes(title_text="time [s]")
+            fig.update_yaxes(title_text="note")
+            self._plotly_fig = fig
+
+        fig = self._plotly_fig
+        if xlim is not None:
+            fig.update_xaxes(range=list(xlim))
+        if ylim is not None:
+            fig.update_yaxes(range=list(ylim))
+        fig.update_layout(plot_bgcolor=bgcolor)
+        return fig
+
+
+@st.cache_resource(max_entries=32)
+def _dense_window(_roll, md5, channel, note_lo, note_hi, end_tick):
+    """
+    Materialize the dense display window of one channel's sparse roll.
+    The leading underscore excludes the matrix from hashing, so
+    Streamlit never pickles or content-hashes the roll data on a cache
+    lookup; the cache is keyed on the owning file's md5 and channel
+    instead. max_entries keeps old windows from pinning dense arrays
+    forever.
+    """
+    return _roll[note_lo:note_hi + 1, :end_tick].toarray()
+
+
+@st.cache_resource
+def _build_cmaps(cmap_name, bgcolor, nch):
+    """
+    Build one colormap per channel with an alpha ramp in the LUT.
+    Cached with st.cache_resource (colormap objects are mutable and
+    unhashable) so the LUTs are not rebuilt on every rerun.
+    """
+    if cmap_name == None:
+        transparent = colorConverter.to_rgba(bgcolor)
+        colors = [
+            mpl.colors.to_rgba(mpl.colors.hsv_to_rgb(
+                (i / nch, 1, 1)), alpha=1)
+            for i in range(nch)
+        ]
+        cmaps = [
+            mpl.colors.LinearSegmentedColormap.from_list(
+                'my_cmap', [transparent, colors[i]], 128)
+            for i in range(nch)
+        ]
+    else:
+        cmap = mpl.colormaps[cmap_name]
+        print(cmap)
+        cmaps = [cmap for i in range(nch)]
+
+    """
+    make look up table (LUT) data, e.g., (K=3)
+        array([[0. , 0. , 0. , 0. ],
+            [0.5, 0. , 0. , 0.2],
+            [1. , 0. , 0. , 0.4],
+            [0. , 0. , 0. , 0.6],
+            [1. , 0. , 0. , 0.8],
+            [0. , 0. , 0. , 1. ]])
+        The first 3 rows are colormap, and the last 3 rows are the colours
+        for data low and high out-of-range values and for masked values.
+        https://stackoverflow.com/questions/18035411/meaning-of-the-colormap-lut-list-in-matplotlib-color
+    """
+    for i in range(nch):
+        cmaps[i]._init()
+        # about 3 extra rows, see the example above
+        alphas = np.linspace(0, 1, cmaps[i].N + 3)
+        cmaps[i]._lut[:, -1] = alphas
+
+    return cmaps
+
+
+@st.cache_resource
+def load_midifile(path, fname, verbose=False):
+    """
+    Parse a MIDI file and build its piano roll once per (path, fname).
+    st.cache_resource keeps the MidiFile object across Streamlit reruns
+    without pickling or hashing the roll data.
+    """
+    return MidiFile(path, fname, verbose=verbose)
+
 
 def get_dirs(folder_path):
     dirs = [f for f in os.listdir(
@@ -448,7 +705,14 @@ def main():
     path_wav = "{0}/{1}/{1}.wav".format(dir, target)
     show_wav(path_wav)
 
-    mid = MidiFile(dir, target, verbose=False)
+    # keep the parsed MidiFile in the session; rebuild only when the
+    # selected file changes, not on every widget interaction
+    path_mid = "{0}/{1}/{1}.mid".format(dir, target)
+    if st.session_state.get("mid_path") != path_mid:
+        st.session_state.mid = load_midifile(dir, target, verbose=False)
+        st.session_state.mid_path = path_mid
+    mid = st.session_state.mid
+    mid.show_basic_info_st()
 
     path_pdf = "{0}/{1}/{1}.pdf".format(dir, target)
     st.sidebar.write('[PDF]({})'.format(path_pdf))
@@ -459,25 +723,30 @@ def main():
     st.sidebar.write("## parameters")
     # cmap_list: colormap name
     # https://matplotlib.org/stable/tutorials/colors/colormaps.html
+    renderer = st.sidebar.selectbox('renderer', ('plotly', 'matplotlib'))
     bgcolor = mid.get_bgcolor_slider(bgcolor='white')
-    cmaps = mid.get_colormap_selector(cmap_name='Purples', bgcolor=bgcolor)
     hlines = st.sidebar.checkbox('Draw lines on C')
 
     xlim = [0, 4]
     xlim = mid.get_xlim_slider(xlim)
 
-    params = {
-        'figsize': (20, 4),
-        'ylim': [30, 92],
-        'cmaps': cmaps,
-        'bgcolor': bgcolor,
-        'vlines': xlim,
-        'hlines': hlines,
-        'colorbar': None,
-        'plot': 'False'
-    }
-    mid.draw_roll(xlim=None, **params)
-    mid.draw_roll(xlim=xlim, **params)
+    if renderer == 'plotly':
+        fig = mid.draw_roll_plotly(xlim=xlim, ylim=[30, 92], bgcolor=bgcolor)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        cmaps = mid.get_colormap_selector(cmap_name='Purples', bgcolor=bgcolor)
+        params = {
+            'figsize': (20, 4),
+            'ylim': [30, 92],
+            'cmaps': cmaps,
+            'bgcolor': bgcolor,
+            'vlines': xlim,
+            'hlines': hlines,
+            'colorbar': None,
+            'plot': 'False'
+        }
+        mid.draw_roll(xlim=None, **params)
+        mid.draw_roll(xlim=xlim, **params)
 
     st.sidebar.write("## MIDI database")
     st.sidebar.write(